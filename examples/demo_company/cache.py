@@ -0,0 +1,242 @@
+"""
+AI Workforce OS - Demo Company Result Cache
+===========================================
+
+This module stores finished workflow results on disk, so repeating a
+request with identical inputs returns instantly instead of re-running the crew.
+"""
+
+import atexit
+import bisect
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+# Optional: results are stored zstd-compressed when zstandard is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Frame header of every zstd blob; pickles start with b'\x80', so the two can't be confused
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+# Inputs hashed as given (NFC only): pasted text, where case and spacing are edits
+_VERBATIM_INPUTS = frozenset({'content'})
+
+
+def _normalize(value: Any, fold: bool = True) -> Any:
+    """
+    Normalize strings to NFC so equal text shares a key
+
+    With fold, strings are also trimmed and lower-cased, so trivially
+    different short inputs (topic, audience, platforms) share a key.
+    """
+    if isinstance(value, str):
+        value = unicodedata.normalize('NFC', value)
+        return value.strip().lower() if fold else value
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item, fold) for item in value]
+    return value
+
+
+class ResultCache:
+    """SQLite cache of workflow results, keyed by a SHA-256 of their inputs"""
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 10000):
+        """
+        Args:
+            path: SQLite database file
+            ttl: Seconds before an entry expires
+            max_entries: Oldest entries are evicted beyond this many
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # zstd (de)compressors aren't thread-safe; they are used under _lock
+        self._compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            model TEXT,
+            created REAL NOT NULL
+        )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(**inputs: Any) -> str:
+        """Hash normalized, JSON-serializable inputs into a stable cache key"""
+        normalized = {name: _normalize(value, fold=name not in _VERBATIM_INPUTS)
+                      for name, value in inputs.items()}
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result, or None on a miss or an expired entry"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND created >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            blob = row[0]
+            if blob[:4] == _ZSTD_MAGIC:
+                if self._decompressor is None:
+                    # Written by an install with zstandard; treat as a miss
+                    return None
+                blob = self._decompressor.decompress(blob)
+        return pickle.loads(blob)
+
+    def set(self, key: str, value: Dict[str, Any], model: Optional[str] = None) -> None:
+        """Store a result under key, evicting the oldest entries past max_entries"""
+        blob = pickle.dumps(value)
+        with self._lock, self._db:
+            if self._compressor is not None:
+                blob = self._compressor.compress(blob)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, model, created) VALUES (?, ?, ?, ?)",
+                (key, blob, model, time.time())
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+
+class SemanticCache:
+    """
+    Maps near-duplicate request texts to the key of an earlier cached result
+
+    Texts are embedded locally with a small sentence-transformer (~10ms per
+    text); a lookup hits when the cosine similarity with an earlier text in
+    the same namespace reaches the threshold. Entries expire with the same
+    TTL as the ResultCache they point into. Requires the optional
+    sentence-transformers package.
+    """
+
+    # Bumped whenever the pickled layout changes; older index files are ignored
+    FORMAT_VERSION = 2
+
+    def __init__(self, path: Optional[str] = None, model_name: str = 'all-MiniLM-L6-v2',
+                 threshold: float = 0.92, ttl: float = 86400, max_entries: int = 10000):
+        """
+        Args:
+            path: Pickle file the index is loaded from and saved to at exit
+            model_name: sentence-transformers model used for embeddings
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds an entry is matched for
+            max_entries: Oldest entries are evicted beyond this many
+        """
+        self.path = path
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._embedder = None
+        self._lock = threading.Lock()
+        # namespace -> (unit-length embeddings, one row per entry; result keys;
+        # creation times, ascending)
+        self._entries: Dict[str, Tuple[Any, List[str], List[float]]] = {}
+        # lookup() and add() embed the same text back to back
+        self._embed = functools.lru_cache(maxsize=256)(self._encode)
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if isinstance(data, dict) and data.get('version') == self.FORMAT_VERSION:
+                self._entries = data['entries']
+                self._prune()
+        if path:
+            atexit.register(self.save)
+
+    def _encode(self, text: str) -> Any:
+        with self._lock:
+            if self._embedder is None:
+                from sentence_transformers import SentenceTransformer
+                self._embedder = SentenceTransformer(self.model_name)
+        return self._embedder.encode([text], normalize_embeddings=True)[0]
+
+    def lookup(self, namespace: str, text: str) -> Optional[str]:
+        """Key of the most similar earlier entry in namespace, if similar enough"""
+        entry = self._entries.get(namespace)
+        if entry is None:
+            return None
+        vectors, keys, created = entry
+        # Skip entries whose result has expired from the ResultCache
+        start = bisect.bisect_left(created, time.time() - self.ttl)
+        if start == len(keys):
+            return None
+        scores = vectors[start:] @ self._embed(text)
+        best = int(scores.argmax())
+        return keys[start + best] if scores[best] >= self.threshold else None
+
+    def add(self, namespace: str, text: str, key: str) -> None:
+        """Remember that text in namespace produced the result stored under key"""
+        import numpy as np
+        
+        vector = self._embed(text)
+        with self._lock:
+            vectors, keys, created = self._entries.get(
+                namespace, (np.empty((0, vector.shape[0]), dtype=vector.dtype), [], [])
+            )
+            self._entries[namespace] = (np.vstack([vectors, vector]), keys + [key],
+                                        created + [time.time()])
+            self._prune()
+
+    def _prune(self) -> None:
+        """Drop expired entries, then the oldest ones past max_entries; caller holds the lock"""
+        cutoff = time.time() - self.ttl
+        for namespace, (vectors, keys, created) in list(self._entries.items()):
+            start = bisect.bisect_left(created, cutoff)
+            self._trim(namespace, start)
+        excess = sum(len(keys) for _, keys, _ in self._entries.values()) - self.max_entries
+        while excess > 0:
+            oldest = min(self._entries, key=lambda ns: self._entries[ns][2][0])
+            excess -= self._trim(oldest, 1)
+
+    def _trim(self, namespace: str, count: int) -> int:
+        """Drop the first count entries of namespace; returns how many were dropped"""
+        if count == 0:
+            return 0
+        vectors, keys, created = self._entries[namespace]
+        if count >= len(keys):
+            del self._entries[namespace]
+            return len(keys)
+        self._entries[namespace] = (vectors[count:], keys[count:], created[count:])
+        return count
+
+    def save(self) -> None:
+        """Write the index to path"""
+        with self._lock, open(self.path, 'wb') as f:
+            self._prune()
+            pickle.dump({'version': self.FORMAT_VERSION, 'entries': self._entries}, f)
+
+
+@functools.lru_cache(maxsize=None)
+def open_cache(path: str, ttl: float = 86400) -> ResultCache:
+    """Shared ResultCache per database file, so agencies reuse one connection"""
+    return ResultCache(path, ttl=ttl)
+
+
+@functools.lru_cache(maxsize=None)
+def open_semantic_cache(path: str, threshold: float = 0.92,
+                        ttl: float = 86400) -> Optional[SemanticCache]:
+    """Shared SemanticCache per index file, or None without sentence-transformers"""
+    if importlib.util.find_spec('sentence_transformers') is None:
+        return None
+    return SemanticCache(path, threshold=threshold, ttl=ttl)
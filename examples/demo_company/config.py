@@ -0,0 +1,49 @@
+"""
+AI Workforce OS - Demo Company Settings
+=======================================
+
+Runtime settings read from the environment (see .env.example).
+"""
+
+import os
+from dotenv import load_dotenv
+
+# Load .env before reading any setting, whichever module imports us first
+load_dotenv()
+
+# CrewAI logging: 0 = off, 1 = agent steps, 2 = full crew output.
+# Off by default: verbose output is rendered and flushed on every step.
+VERBOSE = int(os.getenv('AIWOS_VERBOSE', '0'))
+# Crew-level logging only (task dispatch and results); defaults to VERBOSE
+CREW_VERBOSE = int(os.getenv('CREW_VERBOSE', VERBOSE))
+
+# Default chat model, preselected in the UI
+MODEL_NAME = os.getenv('MODEL_NAME', 'gpt-3.5-turbo')
+# Optional smaller model for research, SEO analysis and reviews (e.g. gpt-4o-mini);
+# the selected model still writes the final text. Unset = one model for everything.
+FAST_MODEL_NAME = os.getenv('FAST_MODEL_NAME') or None
+
+# Where finished workflow results are cached on disk (SQLite), and for how long
+CACHE_PATH = os.getenv('AIWOS_CACHE_PATH', '.aiwf_cache.db')
+CACHE_TTL = float(os.getenv('AIWOS_CACHE_TTL', '86400'))
+
+# Model of the last successful initialization, restored when the UI reloads.
+# One file per server, shared by all users. Only the model id is stored, never
+# the API key.
+AGENCY_SNAPSHOT_PATH = os.getenv('AIWOS_AGENCY_SNAPSHOT', '.agency_snapshot.json')
+
+# Input limits, checked before any LLM call
+MIN_TOPIC_LENGTH = 5
+MIN_WORD_COUNT = 100
+MAX_WORD_COUNT = 2000
+MIN_CONTENT_LENGTH = 50
+
+# Optional self-hosted OpenAI-compatible server (e.g. vLLM), used instead of
+# the OpenAI API when set, e.g. http://localhost:8000/v1
+VLLM_ENDPOINT_URL = os.getenv('VLLM_ENDPOINT_URL')
+
+# Optional semantic cache: near-duplicate requests (cosine similarity of local
+# sentence-transformers embeddings >= threshold) reuse an earlier result
+SEMANTIC_CACHE = os.getenv('AIWOS_SEMANTIC_CACHE', '0') == '1'
+SEMANTIC_CACHE_PATH = os.getenv('AIWOS_SEMANTIC_CACHE_PATH', '.aiwf_semantic.pkl')
+SEMANTIC_THRESHOLD = float(os.getenv('AIWOS_SEMANTIC_THRESHOLD', '0.92'))
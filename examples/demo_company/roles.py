@@ -6,119 +6,129 @@ This module defines the roles for our Mini Content Agency.
 Each role has specific responsibilities and expertise.
 """
 
-from crewai import Agent
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from config import VERBOSE
+
+# crewai is imported where it's used so the UI can start before it loads
+if TYPE_CHECKING:
+    from crewai import Agent
+
+
+# Role definitions, keyed by role name. Each entry is passed straight to Agent().
+# Backstories are kept to one line: they are re-sent with every task prompt.
+ROLES: Dict[str, Dict[str, str]] = {
+    # Research Analyst - finds and verifies information, summarizes research
+    'research_analyst': {
+        'role': 'Research Analyst',
+        'goal': 'Gather accurate and comprehensive information on any given topic',
+        'backstory': 'Expert research analyst; synthesizes reliable sources into cited, fact-checked insights.',
+    },
+    # Content Writer - writes articles in a consistent tone and style
+    'content_writer': {
+        'role': 'Content Writer',
+        'goal': 'Create engaging, well-structured content that resonates with the target audience',
+        'backstory': 'Professional writer; crafts engaging, well-structured content for any audience.',
+    },
+    # SEO Specialist - optimizes content and suggests keywords
+    'seo_specialist': {
+        'role': 'SEO Specialist',
+        'goal': 'Optimize content for maximum search engine visibility and organic reach',
+        'backstory': 'SEO expert; balances keywords and search ranking with readability.',
+    },
+    # Social Media Manager - adapts content to each platform for engagement
+    'social_media_manager': {
+        'role': 'Social Media Manager',
+        'goal': 'Create compelling social media content that drives engagement',
+        'backstory': 'Social media expert; writes platform-native posts that drive engagement.',
+    },
+    # QA Checker - catches errors and enforces quality standards
+    'qa_checker': {
+        'role': 'QA Checker',
+        'goal': 'Ensure all content meets quality standards and is error-free',
+        'backstory': 'Meticulous QA specialist; catches grammar, factual and logic errors before publishing.',
+    },
+}
+
+# Built agents, keyed by (role name, id(llm)), least recently used first. The llm
+# is kept alongside the agent so its id can't be recycled by a different object
+# while the entry is alive. crewai stores the running crew, executor and tools on
+# the agent, so a shared agent must not be in two crews that run at the same time;
+# such crews get their own agents from new_agent. ContentAgency does that and
+# pools whole crews instead (workflow._IDLE_CREWS); this cache backs CompanyRoles.
+_AGENT_CACHE: "OrderedDict[Tuple[str, int], Tuple[object, Agent]]" = OrderedDict()
+_AGENT_CACHE_SIZE = 32
+_AGENT_CACHE_LOCK = threading.Lock()
+
+
+def new_agent(name: str, llm: Optional[object] = None) -> "Agent":
+    """
+    Build a new, unshared Agent for a role
+    
+    Args:
+        name: Key in ROLES, e.g. 'research_analyst'
+        llm: LLM the agent should use
+        
+    Returns:
+        An Agent no other caller holds
+    """
+    from crewai import Agent
+    return Agent(**ROLES[name], llm=llm, verbose=bool(VERBOSE), allow_delegation=False)
+
+
+def build_agent(name: str, llm: Optional[object] = None) -> "Agent":
+    """
+    Get the Agent for a role, building it only once per LLM instance
+    
+    Args:
+        name: Key in ROLES, e.g. 'research_analyst'
+        llm: LLM the agent should use
+        
+    Returns:
+        The shared Agent for this role and LLM
+    """
+    key = (name, id(llm))
+    with _AGENT_CACHE_LOCK:
+        cached = _AGENT_CACHE.get(key)
+        if cached is not None:
+            _AGENT_CACHE.move_to_end(key)
+            return cached[1]
+        
+        agent = new_agent(name, llm)
+        _AGENT_CACHE[key] = (llm, agent)
+        if len(_AGENT_CACHE) > _AGENT_CACHE_SIZE:
+            _AGENT_CACHE.popitem(last=False)
+        return agent
+
 
 class CompanyRoles:
-    """Defines all AI agent roles in the company"""
+    """Defines all AI agent roles in the company (kept for backward compatibility)"""
     
     @staticmethod
-    def research_analyst(llm: Optional[object] = None) -> Agent:
-        """
-        Research Analyst - Information gathering expert
-        
-        Responsibilities:
-        - Find relevant information and data
-        - Verify facts and sources
-        - Provide comprehensive research summaries
-        """
-        return Agent(
-            role='Research Analyst',
-            goal='Gather accurate and comprehensive information on any given topic',
-            backstory="""You are an expert research analyst with 10+ years of experience.
-            You excel at finding reliable sources, verifying facts, and synthesizing 
-            complex information into clear insights. You always cite your sources and 
-            distinguish between facts and opinions.""",
-            llm=llm,
-            verbose=True,
-            allow_delegation=False
-        )
+    def research_analyst(llm: Optional[object] = None) -> "Agent":
+        """Research Analyst - Information gathering expert"""
+        return build_agent('research_analyst', llm)
     
     @staticmethod
-    def content_writer(llm: Optional[object] = None) -> Agent:
-        """
-        Content Writer - Professional writing expert
-        
-        Responsibilities:
-        - Write engaging articles and content
-        - Maintain consistent tone and style
-        - Follow content guidelines
-        """
-        return Agent(
-            role='Content Writer',
-            goal='Create engaging, well-structured content that resonates with the target audience',
-            backstory="""You are a professional content writer with expertise in 
-            creating compelling narratives. You understand how to engage readers,
-            structure arguments effectively, and adapt your writing style to 
-            different audiences and formats.""",
-            llm=llm,
-            verbose=True,
-            allow_delegation=False
-        )
+    def content_writer(llm: Optional[object] = None) -> "Agent":
+        """Content Writer - Professional writing expert"""
+        return build_agent('content_writer', llm)
     
     @staticmethod
-    def seo_specialist(llm: Optional[object] = None) -> Agent:
-        """
-        SEO Specialist - Search optimization expert
-        
-        Responsibilities:
-        - Optimize content for search engines
-        - Suggest relevant keywords
-        - Improve content discoverability
-        """
-        return Agent(
-            role='SEO Specialist',
-            goal='Optimize content for maximum search engine visibility and organic reach',
-            backstory="""You are an SEO expert who understands search algorithms,
-            keyword research, and content optimization. You know how to balance 
-            SEO requirements with readability and user experience.""",
-            llm=llm,
-            verbose=True,
-            allow_delegation=False
-        )
+    def seo_specialist(llm: Optional[object] = None) -> "Agent":
+        """SEO Specialist - Search optimization expert"""
+        return build_agent('seo_specialist', llm)
     
     @staticmethod
-    def social_media_manager(llm: Optional[object] = None) -> Agent:
-        """
-        Social Media Manager - Social content expert
-        
-        Responsibilities:
-        - Create engaging social media posts
-        - Adapt content for different platforms
-        - Maximize engagement and reach
-        """
-        return Agent(
-            role='Social Media Manager',
-            goal='Create compelling social media content that drives engagement',
-            backstory="""You are a social media expert who understands platform-specific
-            best practices, audience psychology, and viral content patterns. You know
-            how to craft posts that generate engagement and conversions.""",
-            llm=llm,
-            verbose=True,
-            allow_delegation=False
-        )
+    def social_media_manager(llm: Optional[object] = None) -> "Agent":
+        """Social Media Manager - Social content expert"""
+        return build_agent('social_media_manager', llm)
     
     @staticmethod
-    def qa_checker(llm: Optional[object] = None) -> Agent:
-        """
-        QA Checker - Quality assurance expert
-        
-        Responsibilities:
-        - Check for errors and inconsistencies
-        - Verify facts and claims
-        - Ensure quality standards
-        """
-        return Agent(
-            role='QA Checker',
-            goal='Ensure all content meets quality standards and is error-free',
-            backstory="""You are a meticulous QA specialist with an eye for detail.
-            You catch grammatical errors, factual inconsistencies, and logical flaws.
-            You ensure every piece of content meets professional standards before 
-            it goes live.""",
-            llm=llm,
-            verbose=True,
-            allow_delegation=False
-        )
+    def qa_checker(llm: Optional[object] = None) -> "Agent":
+        """QA Checker - Quality assurance expert"""
+        return build_agent('qa_checker', llm)
 
 
 # Role hierarchy and interaction patterns
@@ -6,135 +6,405 @@ Simple user interface for interacting with the AI company.
 Built with Gradio for ease of use.
 """
 
+import asyncio
+import atexit
+import sys
+import threading
+
+# Run Gradio's queue and the async crews on libuv's event loop when available.
+# The policy must be set before gradio creates its loop.
+if sys.platform != 'win32':
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
 import gradio as gr
+import hashlib
+import httpx
+import json
 import os
-from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from workflow import ContentAgency, WORKFLOW_TEMPLATES
+import re
+import string
+# config loads .env on import
+from config import (AGENCY_SNAPSHOT_PATH, FAST_MODEL_NAME, MAX_WORD_COUNT, MIN_CONTENT_LENGTH,
+                    MIN_TOPIC_LENGTH, MIN_WORD_COUNT, MODEL_NAME, VLLM_ENDPOINT_URL)
+
+# One HTTP/2 connection pool shared by every LLM client, so concurrent crews
+# multiplex over warm connections instead of opening new TLS sessions
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+_HTTP_CLIENT = httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+_HTTP_ASYNC_CLIENT = httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+@atexit.register
+def _close_http_clients():
+    """Close the shared connection pools on shutdown"""
+    _HTTP_CLIENT.close()
+    try:
+        asyncio.run(_HTTP_ASYNC_CLIENT.aclose())
+    except RuntimeError:
+        # Connections bound to an event loop that is already gone
+        pass
+
+# LLM clients keyed by (model, endpoint, sha256 of API key) so the raw key never
+# becomes a cache key and repeat initializations reuse the warm HTTP client
+_LLM_CACHE = {}
 
-# Load environment variables
-load_dotenv()
+# LLM clients whose warm-up request succeeded, by id (they live in _LLM_CACHE)
+_WARMED = set()
+
+# Model choices as (label, model id) pairs. The dropdown is built from these,
+# so it hands the model id straight to initialize_agency.
+AVAILABLE_MODELS = (
+    ('GPT-3.5 Turbo (Fast)', 'gpt-3.5-turbo'),
+    ('GPT-4o mini (Recommended)', 'gpt-4o-mini'),
+    ('GPT-4o', 'gpt-4o'),
+)
+
+# Models a session may initialize with. ChatOpenAI accepts any name, so a typo or
+# a model the server's key shouldn't pay for is rejected here, before it can
+# reach the server-wide snapshot.
+_ALLOWED_MODELS = frozenset(
+    [model for _, model in AVAILABLE_MODELS] + [MODEL_NAME]
+    + ([FAST_MODEL_NAME] if FAST_MODEL_NAME else [])
+)
 
 # Initialize LLM
-def get_llm():
-    """Get configured LLM instance"""
+def get_llm(model: str = MODEL_NAME):
+    """Get configured LLM instance (shared per model, endpoint and API key)"""
     api_key = os.getenv('OPENAI_API_KEY')
+    if VLLM_ENDPOINT_URL and not api_key:
+        # vLLM only checks the key when started with --api-key
+        api_key = 'EMPTY'
     if not api_key:
         raise ValueError("Please set OPENAI_API_KEY in .env file")
-    
-    return ChatOpenAI(
-        model='gpt-3.5-turbo',
-        temperature=0.7,
-        api_key=api_key
-    )
 
-# Initialize agency
-agency = None
+    key = (model, VLLM_ENDPOINT_URL, hashlib.sha256(api_key.encode()).hexdigest())
+    llm = _LLM_CACHE.get(key)
+    if llm is None:
+        # Imported here so the UI starts without loading langchain
+        from langchain_openai import ChatOpenAI
+        # Crews add their own token callback to copies of this (see ContentAgency._capped_agent)
+        llm = _LLM_CACHE[key] = ChatOpenAI(
+            model=model,
+            temperature=0.7,
+            api_key=api_key,
+            base_url=VLLM_ENDPOINT_URL,
+            streaming=True,
+            http_client=_HTTP_CLIENT,
+            http_async_client=_HTTP_ASYNC_CLIENT
+        )
+    return llm
 
-def initialize_agency():
-    """Initialize the content agency"""
-    global agency
+# Initialize agency. Each browser session keeps its own agency in a gr.State,
+# so users can pick different models without clobbering each other. Streamed
+# output is per request too (see streaming.py): a user only sees their own tokens.
+def initialize_agency(model_id: str = MODEL_NAME, agency=None):
+    """Initialize this session's content agency; returns (status, agency)"""
+    if model_id not in _ALLOWED_MODELS:
+        return (f"❌ Unknown model {model_id!r}. Choose one of: "
+                + ", ".join(sorted(_ALLOWED_MODELS))), agency
     try:
-        llm = get_llm()
-        agency = ContentAgency(llm)
-        return "✅ Agency initialized successfully!"
+        # Imported here so the UI starts without loading the workflow stack
+        from workflow import ContentAgency
+        
+        llm = get_llm(model_id)
+        # Research, SEO and reviews go to FAST_MODEL_NAME when it is set
+        fast_llm = get_llm(FAST_MODEL_NAME) if FAST_MODEL_NAME else llm
+        # get_llm hands back the same instance for the same model, endpoint and key
+        if agency is not None and agency.llm is llm and agency.fast_llm is fast_llm:
+            return "✅ Agency already initialized with this model", agency
+        agency = ContentAgency(llm, fast_llm)
+        _save_snapshot(model_id)
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        return f"❌ Error: {str(e)}", agency
+    _warm_up(llm)
+    _warm_up(fast_llm)
+    return "✅ Agency initialized successfully!", agency
+
+def _warm_up(llm):
+    """
+    Send a one-token request in the background
+    
+    Opens the pooled HTTP/2 connection (and wakes a cold self-hosted endpoint)
+    while the user is still typing, so the first real task doesn't pay for it.
+    Never raises: a failed warm-up is retried on the next initialization.
+    """
+    if id(llm) in _WARMED:
+        return
+    
+    def send():
+        try:
+            # Not streamed: nobody is waiting for this reply
+            probe = llm.model_copy(update={'max_tokens': 1, 'streaming': False, 'callbacks': None})
+            probe.invoke("Hi")
+        except Exception:
+            # Only a warm-up; the first real request reports any problem
+            return
+        _WARMED.add(id(llm))
+    
+    threading.Thread(target=send, name="llm-warm-up", daemon=True).start()
+
+def _save_snapshot(model_id):
+    """
+    Remember the model so a reloaded page can initialize without a click
+    
+    The snapshot is one file for the whole server, so it holds the model of
+    the most recent initialization by any user. Failing to write it only
+    costs that convenience, so errors are ignored.
+    """
+    tmp_path = AGENCY_SNAPSHOT_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model_id': model_id}, f)
+        os.replace(tmp_path, AGENCY_SNAPSHOT_PATH)
+    except OSError:
+        pass
+
+def _load_snapshot():
+    """Model id of the last successful initialization, or None"""
+    try:
+        with open(AGENCY_SNAPSHOT_PATH, encoding='utf-8') as f:
+            model_id = json.load(f).get('model_id')
+    except (OSError, ValueError, AttributeError):
+        return None
+    # Written under a different model list (or edited by hand)
+    return model_id if model_id in _ALLOWED_MODELS else None
+
+def restore_agency():
+    """On page load, re-initialize this session with the model last used on this server"""
+    model_id = _load_snapshot()
+    if model_id is None:
+        return gr.update(), "", None
+    status, agency = initialize_agency(model_id)
+    return model_id, status, agency
+
+# Output templates, parsed once at import rather than on every (streamed) update
+_ARTICLE_HEADER_TMPL = string.Template("""## $title
+
+**Topic:** $topic
+**Target Audience:** $audience
+**Word Count:** $word_count
+
+---""")
+
+_BATCH_SECTION_TMPL = string.Template("""---
 
-def create_article_ui(topic, audience, word_count, progress=gr.Progress()):
-    """UI wrapper for article creation"""
+### $topic
+
+$article""")
+
+_SOCIAL_TMPL = string.Template("""
+## ✅ Social Campaign Created!
+
+**Topic:** $topic
+**Platforms:** $platforms
+
+---
+
+$posts
+""")
+
+_OPTIMIZE_TMPL = string.Template("""
+## ✅ Content Optimized!
+
+### Original Content:
+$original...
+
+---
+
+### Optimized Version:
+$optimized
+""")
+
+# Platform names are split on commas and/or whitespace; unknown names are dropped
+_PLATFORM_SPLIT = re.compile(r'[,\s]+')
+_VALID_PLATFORMS = frozenset({'twitter', 'linkedin', 'facebook', 'instagram', 'tiktok', 'threads'})
+
+# Shown above streamed output; the partial text is joined on, not formatted in
+_WORKING = "⏳ *The team is working...*\n"
+
+# Inputs are checked here, before any handler starts a crew
+_TOPIC_TOO_SHORT = f"❌ Please enter a topic of at least {MIN_TOPIC_LENGTH} characters!"
+
+def _clean_topic(topic):
+    """Stripped topic, or None if it is too short to brief a crew"""
+    topic = (topic or "").strip()
+    return topic if len(topic) >= MIN_TOPIC_LENGTH else None
+
+def _clean_audience(audience):
+    """Stripped audience, defaulting to the general public"""
+    return (audience or "").strip() or "general public"
+
+def _clamp_word_count(word_count):
+    """Word count as an int within the supported range (None if not a number)"""
+    try:
+        return max(MIN_WORD_COUNT, min(MAX_WORD_COUNT, int(word_count)))
+    except (TypeError, ValueError):
+        return None
+
+def _article_header(title, topic, audience, word_count):
+    """Markdown header shown above the article body"""
+    return _ARTICLE_HEADER_TMPL.substitute(
+        title=title, topic=topic, audience=audience, word_count=word_count
+    )
+
+def create_article_ui(agency, topic, audience, word_count, progress=gr.Progress()):
+    """
+    UI wrapper for article creation, streaming the team's output as it is written
+    
+    Yields (header, body) pairs. The header changes only at the start and the
+    end, so streamed tokens re-render just the body.
+    """
     if not agency:
-        return "❌ Please initialize the agency first!"
+        yield "❌ Please initialize the agency first!", ""
+        return
+    
+    topic = _clean_topic(topic)
+    if topic is None:
+        yield _TOPIC_TOO_SHORT, ""
+        return
+    audience = _clean_audience(audience)
+    word_count = _clamp_word_count(word_count)
+    if word_count is None:
+        yield "❌ Please enter a word count!", ""
+        return
     
     try:
         progress(0, desc="Starting workflow...")
+        yield _article_header("⏳ The team is working...", topic, audience, word_count), ""
         
-        progress(0.2, desc="Research in progress...")
-        result = agency.create_article(
+        for partial, result in agency.create_article_stream(
             topic=topic,
             target_audience=audience,
-            word_count=int(word_count)
-        )
+            word_count=word_count
+        ):
+            if result is None:
+                yield gr.update(), partial
         
         progress(1.0, desc="Complete!")
         
-        output = f"""
-## ✅ Article Created Successfully!
-
-**Topic:** {result['topic']}
-**Target Audience:** {result['audience']}
-**Word Count:** {result['word_count']}
-
----
+        header = _article_header(
+            "✅ Article Created Successfully!",
+            result['topic'],
+            result['audience'],
+            result['word_count']
+        )
+        yield header, result['article']
+        
+    except Exception as e:
+        yield f"❌ Error: {str(e)}", ""
 
-{result['article']}
-"""
-        return output
+async def create_articles_batch_ui(agency, topics, audience, word_count, progress=gr.Progress()):
+    """UI wrapper for batch article creation"""
+    if not agency:
+        return "❌ Please initialize the agency first!"
+    
+    topic_list = [t.strip() for t in (topics or "").splitlines() if t.strip()]
+    if not topic_list:
+        return "❌ Please enter at least one topic!"
+    too_short = [t for t in topic_list if _clean_topic(t) is None]
+    if too_short:
+        return (f"❌ Topics must be at least {MIN_TOPIC_LENGTH} characters: "
+                + ", ".join(repr(t) for t in too_short))
+    audience = _clean_audience(audience)
+    word_count = _clamp_word_count(word_count)
+    if word_count is None:
+        return "❌ Please enter a word count!"
+    
+    try:
+        progress((0, len(topic_list)), desc="Starting crews...", unit="articles")
+        results = await agency.create_articles_batch(
+            topics=topic_list,
+            target_audience=audience,
+            word_count=word_count,
+            on_complete=lambda done, total: progress((done, total), desc="Writing articles...", unit="articles")
+        )
+        
+        sections = [f"## ✅ {len(results)} Articles Created!"]
+        for result in results:
+            sections.append(_BATCH_SECTION_TMPL.substitute(
+                topic=result['topic'], article=result['article']
+            ))
+        return "\n\n".join(sections)
         
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
-def create_social_ui(topic, platforms, progress=gr.Progress()):
-    """UI wrapper for social campaign creation"""
+async def create_social_ui(agency, topic, platforms, progress=gr.Progress()):
+    """UI wrapper for social campaign creation, streaming posts as they are written"""
     if not agency:
-        return "❌ Please initialize the agency first!"
+        yield "❌ Please initialize the agency first!"
+        return
+    
+    topic = _clean_topic(topic)
+    if topic is None:
+        yield _TOPIC_TOO_SHORT
+        return
+    
+    # Lower-cased, de-duplicated in input order, only known platforms
+    platform_list = list(dict.fromkeys(
+        p for p in (name.lower() for name in _PLATFORM_SPLIT.split(platforms or "") if name)
+        if p in _VALID_PLATFORMS
+    ))
+    if not platform_list:
+        yield f"❌ Please enter at least one of: {', '.join(sorted(_VALID_PLATFORMS))}"
+        return
     
     try:
         progress(0, desc="Starting campaign...")
         
-        platform_list = [p.strip() for p in platforms.split(',')]
-        
-        progress(0.3, desc="Creating posts...")
-        result = agency.create_social_campaign(
+        parts = [_WORKING, ""]
+        async for partial, result in agency.create_social_campaign_stream(
             topic=topic,
             platforms=platform_list
-        )
+        ):
+            if result is None:
+                parts[1] = partial
+                yield "\n".join(parts)
         
         progress(1.0, desc="Complete!")
         
-        output = f"""
-## ✅ Social Campaign Created!
-
-**Topic:** {result['topic']}
-**Platforms:** {', '.join(result['platforms'])}
-
----
-
-{result['posts']}
-"""
-        return output
+        yield _SOCIAL_TMPL.substitute(
+            topic=result['topic'],
+            platforms=', '.join(result['platforms']),
+            posts=result['posts']
+        )
         
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
 
-def optimize_content_ui(content, progress=gr.Progress()):
-    """UI wrapper for content optimization"""
+def optimize_content_ui(agency, content, progress=gr.Progress()):
+    """UI wrapper for content optimization, streaming the rewrite as it is written"""
     if not agency:
-        return "❌ Please initialize the agency first!"
+        yield "❌ Please initialize the agency first!"
+        return
+    
+    if len((content or "").strip()) < MIN_CONTENT_LENGTH:
+        yield f"❌ Please paste at least {MIN_CONTENT_LENGTH} characters of content!"
+        return
     
     try:
         progress(0, desc="Analyzing content...")
         
-        progress(0.3, desc="Optimizing...")
-        result = agency.optimize_content(existing_content=content)
+        parts = [_WORKING, ""]
+        for partial, result in agency.optimize_content_stream(existing_content=content):
+            if result is None:
+                parts[1] = partial
+                yield "\n".join(parts)
         
         progress(1.0, desc="Complete!")
         
-        output = f"""
-## ✅ Content Optimized!
-
-### Original Content:
-{result['original_content'][:200]}...
-
----
-
-### Optimized Version:
-{result['optimized_content']}
-"""
-        return output
+        yield _OPTIMIZE_TMPL.substitute(
+            original=result['original_content'][:200],
+            optimized=result['optimized_content']
+        )
         
     except Exception as e:
-        return f"❌ Error: {str(e)}"
+        yield f"❌ Error: {str(e)}"
 
 
 # Build Gradio Interface
@@ -162,12 +432,27 @@ def build_interface():
             **Before starting:**
             1. Create a `.env` file in this directory
             2. Add your OpenAI API key: `OPENAI_API_KEY=your_key_here`
-            3. Click 'Initialize Agency' below
+            3. Pick a model and click 'Initialize Agency' below
             """)
             
+            model_choice = gr.Dropdown(
+                label="Model",
+                choices=list(AVAILABLE_MODELS),
+                value=MODEL_NAME,
+                allow_custom_value=True
+            )
             init_btn = gr.Button("🚀 Initialize Agency", variant="primary")
             init_output = gr.Textbox(label="Status", interactive=False)
-            init_btn.click(initialize_agency, outputs=init_output)
+            agency_state = gr.State(None)
+            init_btn.click(
+                initialize_agency,
+                inputs=[model_choice, agency_state],
+                outputs=[init_output, agency_state]
+            )
+            demo.load(
+                restore_agency,
+                outputs=[model_choice, init_output, agency_state]
+            )
         
         gr.Markdown("---")
         
@@ -197,18 +482,55 @@ def build_interface():
                         article_words = gr.Number(
                             label="Word Count",
                             value=500,
-                            minimum=100,
-                            maximum=2000
+                            minimum=MIN_WORD_COUNT,
+                            maximum=MAX_WORD_COUNT
                         )
                         article_btn = gr.Button("🚀 Create Article", variant="primary")
                     
                     with gr.Column():
-                        article_output = gr.Markdown(label="Result")
+                        article_header = gr.Markdown(label="Result")
+                        article_output = gr.Markdown()
                 
                 article_btn.click(
                     create_article_ui,
-                    inputs=[article_topic, article_audience, article_words],
-                    outputs=article_output
+                    inputs=[agency_state, article_topic, article_audience, article_words],
+                    outputs=[article_header, article_output]
+                )
+            
+            # Batch Articles Tab
+            with gr.Tab("📚 Batch Articles"):
+                gr.Markdown("""
+                **Workflow:** Research → Write → SEO → QA, for every topic
+                
+                Enter one topic per line. Up to 8 articles are produced at the same time.
+                """)
+                
+                with gr.Row():
+                    with gr.Column():
+                        batch_topics = gr.Textbox(
+                            label="Article Topics (one per line)",
+                            placeholder="Benefits of AI in Healthcare\nAI in Education",
+                            lines=6
+                        )
+                        batch_audience = gr.Textbox(
+                            label="Target Audience",
+                            value="general public"
+                        )
+                        batch_words = gr.Number(
+                            label="Word Count",
+                            value=500,
+                            minimum=MIN_WORD_COUNT,
+                            maximum=MAX_WORD_COUNT
+                        )
+                        batch_btn = gr.Button("🚀 Create Articles", variant="primary")
+                    
+                    with gr.Column():
+                        batch_output = gr.Markdown(label="Result")
+                
+                batch_btn.click(
+                    create_articles_batch_ui,
+                    inputs=[agency_state, batch_topics, batch_audience, batch_words],
+                    outputs=batch_output
                 )
             
             # Social Campaign Tab
@@ -229,7 +551,7 @@ def build_interface():
                         social_platforms = gr.Textbox(
                             label="Platforms (comma-separated)",
                             value="twitter, linkedin, facebook",
-                            placeholder="twitter, linkedin, facebook, instagram"
+                            placeholder="twitter, linkedin, facebook, instagram, tiktok, threads"
                         )
                         social_btn = gr.Button("🚀 Create Campaign", variant="primary")
                     
@@ -238,7 +560,7 @@ def build_interface():
                 
                 social_btn.click(
                     create_social_ui,
-                    inputs=[social_topic, social_platforms],
+                    inputs=[agency_state, social_topic, social_platforms],
                     outputs=social_output
                 )
             
@@ -264,7 +586,7 @@ def build_interface():
                 
                 optimize_btn.click(
                     optimize_content_ui,
-                    inputs=[optimize_input],
+                    inputs=[agency_state, optimize_input],
                     outputs=optimize_output
                 )
         
@@ -275,7 +597,7 @@ def build_interface():
         
         This is a working prototype of an AI-powered content agency with:
         - **5 AI Agents** with specialized roles
-        - **3 Workflows** for different content needs
+        - **4 Workflows** for different content needs
         - **Autonomous collaboration** between agents
         
         **Cost per task:** ~$0.05-0.15 (using GPT-3.5-turbo)
@@ -288,4 +610,7 @@ def build_interface():
 
 if __name__ == "__main__":
     demo = build_interface()
+    # Let up to 8 requests run at once instead of one at a time,
+    # and turn new requests away once 64 are waiting
+    demo.queue(default_concurrency_limit=8, max_size=64)
     demo.launch(share=False, server_name="0.0.0.0", server_port=7860)
@@ -0,0 +1,138 @@
+"""
+AI Workforce OS - Demo Company Streaming
+========================================
+
+This module forwards LLM tokens to the UI while a crew is still working,
+so users see output as it is generated instead of after the last task.
+
+Each workflow call gets its own TokenStream. The LLMs of each pooled crew
+report to that crew's TokenSink, which is attached to the stream of the
+request currently running the crew, so a user only sees their own tokens.
+"""
+
+import asyncio
+import contextvars
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class TokenStream:
+    """
+    Tokens generated for one workflow call, collected from any thread
+
+    Tokens are kept per LLM run, so tasks running in parallel (e.g. one post
+    per platform) each build up their own block instead of interleaving.
+    """
+
+    def __init__(self):
+        self._tokens: "queue.Queue[Tuple[Any, str]]" = queue.Queue()
+        # run id -> text, in the order the runs started
+        self._runs: Dict[Any, str] = {}
+
+    def put(self, run_id: Any, token: str) -> None:
+        """Add a token of one LLM run; called from the threads running the crew's tasks"""
+        self._tokens.put((run_id, token))
+
+    def pending(self) -> bool:
+        """Whether tokens arrived that text doesn't include yet"""
+        return not self._tokens.empty()
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for new tokens; returns whether any arrived"""
+        try:
+            self._add(*self._tokens.get(timeout=timeout))
+        except queue.Empty:
+            return False
+        self.poll()
+        return True
+
+    def poll(self) -> bool:
+        """Take in every token that has arrived; returns whether there were any"""
+        new = False
+        while True:
+            try:
+                self._add(*self._tokens.get_nowait())
+            except queue.Empty:
+                return new
+            new = True
+
+    def _add(self, run_id: Any, token: str) -> None:
+        self._runs[run_id] = self._runs.get(run_id, "") + token
+
+    @property
+    def text(self) -> str:
+        """Text streamed so far, one paragraph block per LLM run"""
+        return "\n\n".join(self._runs.values())
+
+
+class TokenSink(BaseCallbackHandler):
+    """
+    Callback handler of one pooled crew's LLMs
+
+    A crew runs one request at a time; while it does, stream is that
+    request's TokenStream. Tokens generated with no stream attached are dropped.
+    """
+
+    def __init__(self):
+        self.stream: Optional[TokenStream] = None
+
+    def on_llm_new_token(self, token: str, *, run_id: Any = None, **kwargs: Any) -> None:
+        """Forward each new token to the attached stream"""
+        stream = self.stream
+        if stream is not None:
+            stream.put(run_id, token)
+
+
+# Stream of the workflow call running in this context, if it is being streamed
+_CURRENT_STREAM: contextvars.ContextVar[Optional[TokenStream]] = contextvars.ContextVar(
+    'current_stream', default=None
+)
+
+
+def current_stream() -> Optional[TokenStream]:
+    """TokenStream of the workflow call being streamed in this context, or None"""
+    return _CURRENT_STREAM.get()
+
+
+def stream_call(fn: Callable[..., Any], *args: Any,
+                **kwargs: Any) -> Iterator[Tuple[str, Optional[Any]]]:
+    """
+    Run a blocking workflow call in a worker thread while streaming its tokens
+
+    Args:
+        fn: The workflow call, e.g. agency.create_article
+
+    Yields:
+        (text_so_far, None) as tokens arrive, then (text, result) once fn returns.
+        Exceptions raised by fn are re-raised here.
+    """
+    stream = TokenStream()
+    context = contextvars.copy_context()
+    context.run(_CURRENT_STREAM.set, stream)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(context.run, fn, *args, **kwargs)
+        while not future.done() or stream.pending():
+            if stream.wait(timeout=0.1):
+                yield stream.text, None
+        yield stream.text, future.result()
+
+
+async def astream_call(fn: Callable[..., Awaitable[Any]], *args: Any,
+                       **kwargs: Any) -> AsyncIterator[Tuple[str, Optional[Any]]]:
+    """Like stream_call, for a coroutine function awaited on the running event loop"""
+    stream = TokenStream()
+    # The task copies the current context, stream included
+    reset = _CURRENT_STREAM.set(stream)
+    try:
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+    finally:
+        _CURRENT_STREAM.reset(reset)
+    while not task.done() or stream.pending():
+        if stream.poll():
+            yield stream.text, None
+        else:
+            await asyncio.wait({task}, timeout=0.1)
+    yield stream.text, task.result()
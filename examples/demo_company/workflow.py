@@ -5,24 +5,428 @@ AI Workforce OS - Demo Company Workflow
 This module defines how tasks flow through the AI company.
 """
 
-from crewai import Task, Crew
-from typing import List, Dict, Any
-from roles import CompanyRoles
+import asyncio
+import json
+import re
+import threading
+import time
+import urllib.parse
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import (TYPE_CHECKING, AsyncIterator, Callable, ContextManager, Generator, Iterator,
+                    List, Dict, Any, Mapping, Optional, Tuple, TypeVar)
+from cache import ResultCache, open_cache, open_semantic_cache
+from config import (CACHE_PATH, CACHE_TTL, MAX_WORD_COUNT, MIN_CONTENT_LENGTH,
+                    MIN_TOPIC_LENGTH, MIN_WORD_COUNT, SEMANTIC_CACHE, SEMANTIC_CACHE_PATH,
+                    SEMANTIC_THRESHOLD, CREW_VERBOSE)
+from roles import ROLES, WORKFLOWS, new_agent
+from streaming import TokenSink, astream_call, current_stream, stream_call
+
+# crewai is imported where it's used so the UI can start before it loads
+if TYPE_CHECKING:
+    from crewai import Agent, Crew, Task
+
+# How long a research summary is reused for later requests on the same topic
+RESEARCH_TTL_SECONDS = 24 * 60 * 60
+
+# Workflows keyed by a short topic. Only these use the semantic cache: long
+# pasted content is truncated by the embedding model, so two different
+# documents with the same opening would match each other.
+_SEMANTIC_METHODS = frozenset({'create_article', 'create_social_campaign'})
+
+# Output token limits per task. Generation time grows with output length, so
+# each task stops at a budget sized to what it writes. Long-form budgets are
+# rounded up to a multiple of TOKEN_BUCKET so a few crew shapes cover all lengths.
+RESEARCH_MAX_TOKENS = 512
+# The article reviewer writes an assessment report; the merge task returns the text
+REVIEW_MAX_TOKENS = 768
+SOCIAL_MAX_TOKENS = 1024
+JOIN_MAX_TOKENS = 8
+TOKEN_BUCKET = 512
+# Extra budget for tasks that return the full text plus a report or comparison
+REPORT_HEADROOM_TOKENS = 1024
+
+# Campaigns for more platforms than this write every post in one JSON-output task
+# instead of one task per platform, so the posts share a single LLM call
+SOCIAL_BATCH_THRESHOLD = 4
+
+# Task prompt templates. Static instructions come first and per-request values
+# last, so every prompt shares a byte-identical prefix. Filled with format_map.
+_RESEARCH_TMPL = """Research the topic below
+
+Requirements:
+- Find 5-7 key points about the topic
+- Include relevant statistics or data
+- Identify current trends or developments
+- Note credible sources
+
+Topic: {topic}
+Target audience: {audience}"""
+
+_WRITING_TMPL = """Write an article about the topic below
+
+Requirements:
+- Use the research findings
+- Include: introduction, main points, conclusion
+- Make it engaging and easy to read
+- Use active voice and clear language
+
+Topic: {topic}
+Target audience: {audience}
+Length: {word_count} words"""
+
+_SEO_TMPL = """Optimize the article for SEO
+
+Requirements:
+- Suggest 5-7 relevant keywords
+- Recommend title variations
+- Suggest meta description
+- Identify internal linking opportunities
+- Ensure content is search-friendly"""
+
+_QA_TMPL = """Review the article for quality
+
+Check for:
+- Grammatical errors
+- Factual accuracy
+- Logical flow
+- Readability
+- Consistency
+
+Provide specific feedback if issues are found."""
+
+_MERGE_TMPL = """Produce the final version of the article
+
+Requirements:
+- Apply the QA feedback
+- Apply the SEO recommendations without hurting readability
+- Keep the structure and key facts of the article"""
+
+_SOCIAL_RESEARCH_TMPL = """Research the topic below for social media
+
+Focus on:
+- Current conversations and trends
+- Engaging angles
+- Key talking points
+- Relevant hashtags
+
+Topic: {topic}"""
+
+_SOCIAL_TMPL = """Create a social media post about the topic below
+
+Requirements:
+- Platform-specific format and length
+- Engaging hook
+- Clear call-to-action
+- Relevant hashtags
+- Emojis where appropriate
+
+Topic: {topic}
+Platform: {platform}"""
+
+_SOCIAL_BATCH_TMPL = """Create one social media post per platform about the topic below
+
+Requirements:
+- Platform-specific format and length
+- Engaging hook
+- Clear call-to-action
+- Relevant hashtags
+- Emojis where appropriate
+- Reply with a single JSON object mapping each platform name to its post, and nothing else
+
+Topic: {topic}
+Platforms: {platforms}"""
+
+# Ends a crew of parallel post tasks. crewai only waits for async tasks that a
+# later sync task uses as context; this one does so and writes next to nothing.
+_SOCIAL_JOIN_TMPL = """Confirm that a post was written for every platform: {platforms}
+
+Reply with only the word DONE"""
+
+_SOCIAL_QA_TMPL = """Review social posts
+
+Check for:
+- Grammar and spelling
+- Brand voice consistency
+- Platform appropriateness
+- Engagement potential"""
+
+_SOCIAL_QA_JSON_NOTE = """
+
+Reply with the approved posts as a single JSON object mapping each platform name
+to its post, in the same format you received them, and nothing else."""
+
+_SOCIAL_ISSUES_TMPL = """
+
+Fix at least these issues found by the automatic checks:
+{issues}
+
+Posts:
+{drafts}"""
+
+_OPTIMIZE_SEO_TMPL = """Analyze and optimize the content below
+
+Provide:
+- SEO score (1-10)
+- Keyword suggestions
+- Content structure improvements
+- Meta data recommendations
+
+Content:
+{content}"""
+
+_REWRITE_TMPL = """Rewrite the content based on SEO recommendations
+
+Keep:
+- Core message
+- Key facts
+
+Improve:
+- Structure
+- Readability
+- SEO optimization"""
+
+_COMPARE_TMPL = """Compare original and optimized versions
+
+Ensure:
+- Message integrity
+- Factual accuracy
+- Quality improvements
+- No errors introduced"""
+
+
+def _task_text(output: Any) -> str:
+    """Plain text of a TaskOutput across crewai versions"""
+    return str(getattr(output, 'raw', None) or getattr(output, 'raw_output', None) or output)
+
+
+def _research_notes(research: Optional[str]) -> str:
+    """Research findings to append to a task that skips the research step"""
+    return f"\n\nResearch findings:\n{research}" if research else ""
+
+
+def _require_topic(topic: str) -> str:
+    """Stripped topic; raises ValueError if it is too short to brief a crew"""
+    topic = (topic or "").strip()
+    if len(topic) < MIN_TOPIC_LENGTH:
+        raise ValueError(f"Topic must be at least {MIN_TOPIC_LENGTH} characters: {topic!r}")
+    return topic
+
+
+def _require_word_count(word_count: int) -> None:
+    """Raise ValueError unless word_count is within the supported range"""
+    if not MIN_WORD_COUNT <= word_count <= MAX_WORD_COUNT:
+        raise ValueError(f"Word count must be between {MIN_WORD_COUNT} and {MAX_WORD_COUNT}, "
+                         f"got {word_count}")
+
+
+def _model_id(llm: Any) -> str:
+    """Model name of an LLM client, for cache keys"""
+    return getattr(llm, 'model_name', None) or type(llm).__name__
+
+
+def _long_form_tokens(words: int) -> int:
+    """Token budget for a task that writes or rewrites about this many words"""
+    tokens = max(1024, int(words * 1.6))
+    return -(-tokens // TOKEN_BUCKET) * TOKEN_BUCKET
+
+
+_CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
+
+def _parse_posts(text: str, platforms: List[str]) -> Optional[Dict[str, str]]:
+    """Posts by platform from a JSON reply, or None if the reply isn't one"""
+    try:
+        posts = json.loads(_CODE_FENCE.sub('', text))
+    except ValueError:
+        return None
+    if not isinstance(posts, dict):
+        return None
+    by_name = {str(name).lower(): str(post) for name, post in posts.items()}
+    return {platform: by_name[platform.lower()]
+            for platform in platforms if platform.lower() in by_name}
+
+
+# Automatic checks on drafted social posts. Campaigns that pass them skip the
+# LLM review; only posts with red flags are sent to the QA checker.
+_POST_LENGTH_LIMITS = {
+    'twitter': 280,
+    'threads': 500,
+    'instagram': 2200,
+    'tiktok': 2200,
+    'linkedin': 3000,
+    'facebook': 5000,
+}
+_HASHTAG_LIMITS = {'instagram': 30, 'tiktok': 10}
+_DEFAULT_HASHTAG_LIMIT = 5
+_MAX_EMOJIS = 10
+_HASHTAG = re.compile(r'(?<!\w)#\w+')
+_URL = re.compile(r'https?://[^\s)\]>]+')
+_EMOJI = re.compile('[\U0001F300-\U0001FAFF\u2600-\u27BF]')
+# Template leftovers such as "[Insert link]" or "[Your Company]"
+_PLACEHOLDER = re.compile(r'\[(?:insert|add|your|link|url)\b[^\]]*\]', re.IGNORECASE)
+
+
+def _quick_qa(posts: Dict[str, str], platforms: List[str]) -> List[str]:
+    """
+    Rule-based review of drafted posts
+    
+    Args:
+        posts: Post text by platform
+        platforms: Platforms the campaign asked for
+        
+    Returns:
+        One message per problem found; empty when the posts look publishable
+    """
+    issues = []
+    for platform in platforms:
+        post = posts.get(platform, "").strip()
+        if not post:
+            issues.append(f"{platform}: post is missing")
+            continue
+        limit = _POST_LENGTH_LIMITS.get(platform)
+        if limit and len(post) > limit:
+            issues.append(f"{platform}: {len(post)} characters, the limit is {limit}")
+        hashtags = len(_HASHTAG.findall(post))
+        hashtag_limit = _HASHTAG_LIMITS.get(platform, _DEFAULT_HASHTAG_LIMIT)
+        if hashtags > hashtag_limit:
+            issues.append(f"{platform}: {hashtags} hashtags, use at most {hashtag_limit}")
+        if len(_EMOJI.findall(post)) > _MAX_EMOJIS:
+            issues.append(f"{platform}: more than {_MAX_EMOJIS} emojis")
+        for url in _URL.findall(post):
+            host = urllib.parse.urlparse(url.rstrip('.,;:!?')).hostname or ""
+            if '.' not in host:
+                issues.append(f"{platform}: invalid link {url}")
+        for placeholder in _PLACEHOLDER.findall(post):
+            issues.append(f"{platform}: unfilled placeholder {placeholder}")
+    return issues
+
+
+def _format_posts(posts: Dict[str, str]) -> str:
+    """Posts as Markdown, one section per platform"""
+    return "\n\n".join(f"### {platform.title()}\n\n{post.strip()}" for platform, post in posts.items())
+
+
+def _drafted_posts(crew: "Crew", platforms: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Draft text and posts by platform from a social crew that has finished"""
+    if len(platforms) > SOCIAL_BATCH_THRESHOLD:
+        drafts = _task_text(crew.tasks[-1].output)
+        return drafts, _parse_posts(drafts, platforms) or {}
+    # Several posts are followed by the join task, which wrote nothing worth keeping
+    post_tasks = crew.tasks[-len(platforms) - 1:-1] if len(platforms) > 1 else crew.tasks[-1:]
+    posts = {platform: _task_text(task.output) for platform, task in zip(platforms, post_tasks)}
+    return _format_posts(posts), posts
+
+
+# (id(base llm), max_tokens) -> (base llm, copy with that output limit). Module
+# level so every session on the same LLM gets the same copies. The base is kept
+# alongside so its id can't be recycled by a different object.
+_CAPPED_LLMS: Dict[Tuple[int, int], Tuple[Any, Any]] = {}
+_CAPPED_LLMS_LOCK = threading.Lock()
+
+
+def _capped_llm(base: Any, max_tokens: int) -> Any:
+    """
+    Copy of base with an output limit of max_tokens
+    
+    The copy keeps the original's HTTP client and callbacks.
+    """
+    if not hasattr(base, 'model_copy'):
+        # No llm (crewai's default) or not a pydantic chat model
+        return base
+    key = (id(base), max_tokens)
+    with _CAPPED_LLMS_LOCK:
+        entry = _CAPPED_LLMS.get(key)
+        if entry is None:
+            entry = _CAPPED_LLMS[key] = (base, base.model_copy(update={'max_tokens': max_tokens}))
+    return entry[1]
+
+
+def _advance(steps: Generator["Crew", Any, Dict[str, Any]],
+             value: Any = None) -> Tuple[Optional["Crew"], Optional[Dict[str, Any]]]:
+    """
+    Send value into a workflow generator
+    
+    Returns:
+        (next crew to run, None), or (None, result) once the workflow is done.
+        StopIteration can't cross asyncio.to_thread, so it is turned into a value.
+    """
+    try:
+        return steps.send(value), None
+    except StopIteration as done:
+        return None, done.value
+
+
+_T = TypeVar('_T')
+
+
+@asynccontextmanager
+async def _in_thread(manager: ContextManager[_T]) -> AsyncIterator[_T]:
+    """Enter and exit a blocking context manager (e.g. a crew checkout) in a worker thread"""
+    value = await asyncio.to_thread(manager.__enter__)
+    try:
+        yield value
+    finally:
+        await asyncio.to_thread(manager.__exit__, None, None, None)
+
+
+@dataclass
+class _PooledCrew:
+    """
+    A built Crew whose task prompts are re-filled for every run
+    
+    Building a Crew validates its task graph, so crews are kept per shape
+    (which tasks exist) and only their descriptions change between requests.
+    """
+    crew: "Crew"
+    # (task, description template, expected output template), filled with format_map
+    prompts: List[Tuple["Task", str, str]] = field(default_factory=list)
+    research_task: Optional["Task"] = None
+    # Receives the tokens of this crew's agents, for the request running it
+    sink: TokenSink = field(default_factory=TokenSink)
+    
+    def fill(self, prompt_vars: Dict[str, Any]) -> None:
+        """Write this request's values into every task prompt"""
+        for task, description, expected_output in self.prompts:
+            task.description = description.format_map(prompt_vars)
+            task.expected_output = expected_output.format_map(prompt_vars)
+
+
+# (id(llm), id(fast_llm), crew shape) -> (llm, fast_llm, built crews not running
+# right now; one per concurrent run). Module level so a new session on the same
+# LLMs reuses the crews earlier sessions built. The LLMs are kept alongside so
+# their ids can't be recycled by different objects.
+_IDLE_CREWS: Dict[Tuple[int, int, Tuple[Any, ...]], Tuple[Any, Any, List[_PooledCrew]]] = {}
+_IDLE_CREWS_LOCK = threading.Lock()
+
 
 class ContentAgency:
     """Main workflow orchestrator for the Mini Content Agency"""
     
-    def __init__(self, llm=None):
-        """Initialize the agency with all roles"""
+    def __init__(self, llm=None, fast_llm=None):
+        """
+        Initialize the agency with all roles
+        
+        Args:
+            llm: Model for the tasks that write the final text (writing, posts,
+                the final editing pass)
+            fast_llm: Smaller, faster model for research, SEO analysis and
+                reviews; defaults to llm
+        """
         self.llm = llm
-        self.roles = CompanyRoles()
-        
-        # Initialize all agents
-        self.researcher = self.roles.research_analyst(llm)
-        self.writer = self.roles.content_writer(llm)
-        self.seo = self.roles.seo_specialist(llm)
-        self.social = self.roles.social_media_manager(llm)
-        self.qa = self.roles.qa_checker(llm)
+        self.fast_llm = fast_llm if fast_llm is not None else llm
+        self.model_id = _model_id(llm)
+        if self.fast_llm is not llm:
+            self.model_id += '+' + _model_id(self.fast_llm)
+        self.cache = open_cache(CACHE_PATH, CACHE_TTL)
+        self.semantic = (open_semantic_cache(SEMANTIC_CACHE_PATH, SEMANTIC_THRESHOLD, CACHE_TTL)
+                         if SEMANTIC_CACHE else None)
+        # (topic, audience) -> (timestamp, research summary). Article research is
+        # written for an audience, so later articles only reuse it for the same one.
+        # (topic, None) holds the latest research on the topic, article or social;
+        # campaigns reuse that. Social research is too shallow for an article.
+        self._research_cache: Dict[Tuple[str, Optional[str]], Tuple[float, str]] = {}
     
     def create_article(self, topic: str, target_audience: str = "general public", 
                       word_count: int = 500) -> Dict[str, Any]:
@@ -36,85 +440,302 @@ class ContentAgency:
             
         Returns:
             Dictionary with article content and metadata
+            
+        Raises:
+            ValueError: If the topic is too short or word_count is out of range
+        """
+        topic = _require_topic(topic)
+        _require_word_count(word_count)
+        
+        key = self._cache_key('create_article', topic=topic, audience=target_audience,
+                              word_count=word_count)
+        cached = self._cache_get(key, 'create_article', topic,
+                                 audience=target_audience, word_count=word_count)
+        if cached is not None:
+            return cached
+        
+        with self._article_crew(topic, target_audience, word_count) as crew:
+            result = crew.kickoff()
+        
+        article = {
+            'article': str(result),
+            'topic': topic,
+            'audience': target_audience,
+            'word_count': word_count
+        }
+        self._cache_set(key, article, 'create_article', topic,
+                        audience=target_audience, word_count=word_count)
+        return article
+    
+    def create_article_stream(self, topic: str, target_audience: str = "general public",
+                              word_count: int = 500) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
         """
+        Create an article, streaming the team's output as it is generated
         
-        # Task 1: Research
-        research_task = Task(
-            description=f"""Research the topic: {topic}
+        Yields:
+            (text_so_far, None) while the crew works, then (text, article dictionary)
+        """
+        yield from stream_call(self.create_article, topic, target_audience, word_count)
+    
+    async def create_articles_batch(self, topics: List[str], target_audience: str = "general public",
+                                    word_count: int = 500, concurrency: int = 8,
+                                    on_complete: Optional[Callable[[int, int], None]] = None
+                                    ) -> List[Dict[str, Any]]:
+        """
+        Create several articles concurrently
+        
+        Args:
+            topics: Article topics, one article per topic
+            target_audience: Who the articles are for
+            word_count: Target word count for every article
+            concurrency: Maximum number of crews running at the same time
+            on_complete: Optional callback receiving (finished, total) after each article
             
-            Requirements:
-            - Find 5-7 key points about the topic
-            - Include relevant statistics or data
-            - Identify current trends or developments
-            - Note credible sources
+        Returns:
+            List of article dictionaries, in the same order as topics
             
-            Target audience: {target_audience}""",
-            expected_output="A comprehensive research summary with key findings and sources",
-            agent=self.researcher
-        )
+        Raises:
+            ValueError: If any topic is too short or word_count is out of range,
+                before any crew starts
+        """
+        topics = [_require_topic(topic) for topic in topics]
+        _require_word_count(word_count)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        finished = 0
+        
+        # Cache access (SQLite, embeddings) and crew building block, so they run in
+        # worker threads; only the crews' kickoff is awaited on the event loop
+        async def run(topic: str) -> Dict[str, Any]:
+            nonlocal finished
+            key = self._cache_key('create_article', topic=topic, audience=target_audience,
+                                  word_count=word_count)
+            article = await asyncio.to_thread(self._cache_get, key, 'create_article', topic,
+                                              audience=target_audience, word_count=word_count)
+            if article is None:
+                async with semaphore, _in_thread(
+                        self._article_crew(topic, target_audience, word_count)) as crew:
+                    result = await crew.kickoff_async()
+                article = {
+                    'article': str(result),
+                    'topic': topic,
+                    'audience': target_audience,
+                    'word_count': word_count
+                }
+                await asyncio.to_thread(self._cache_set, key, article, 'create_article', topic,
+                                        audience=target_audience, word_count=word_count)
+            finished += 1
+            if on_complete:
+                on_complete(finished, len(topics))
+            return article
+        
+        return await asyncio.gather(*(run(topic) for topic in topics))
+    
+    def _cache_key(self, method: str, **inputs: Any) -> str:
+        """Cache key for a workflow call on this agency's model"""
+        return ResultCache.make_key(method=method, model=self.model_id, **inputs)
+    
+    def _cache_get(self, key: str, method: str, text: str, **params: Any) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached workflow result
+        
+        Args:
+            key: Exact-match key from _cache_key
+            method: Workflow name
+            text: Free-text input compared by the semantic cache (the topic)
+            params: Remaining inputs; the semantic cache only matches when these are equal
+            
+        Returns:
+            The exact-match result, else (for topic-based workflows) the result of a
+            near-duplicate request, else None
+        """
+        cached = self.cache.get(key)
+        if cached is None and self.semantic is not None and method in _SEMANTIC_METHODS:
+            similar_key = self.semantic.lookup(self._cache_key(method, **params), text)
+            if similar_key is not None:
+                cached = self.cache.get(similar_key)
+        return cached
+    
+    def _cache_set(self, key: str, value: Dict[str, Any], method: str, text: str,
+                   **params: Any) -> None:
+        """Store a workflow result; arguments as for _cache_get"""
+        self.cache.set(key, value, self.model_id)
+        if self.semantic is not None and method in _SEMANTIC_METHODS:
+            self.semantic.add(self._cache_key(method, **params), text, key)
+    
+    def _cached_research(self, topic: str, audience: Optional[str] = None) -> Optional[str]:
+        """Research summary for topic and audience if one was produced within the TTL"""
+        entry = self._research_cache.get((topic, audience))
+        if entry is None:
+            return None
+        created, research = entry
+        if time.time() - created > RESEARCH_TTL_SECONDS:
+            # Another thread may have expired it already
+            self._research_cache.pop((topic, audience), None)
+            return None
+        return research
+    
+    def _capped_agent(self, name: str, max_tokens: int, sink: TokenSink,
+                      fast: bool = False) -> "Agent":
+        """
+        New agent for a role whose LLM stops after max_tokens output tokens
+        
+        Each pooled crew gets its own agents: crewai keeps per-run state on
+        them, and pooled crews of the same shape run concurrently. The agent's
+        LLM reports its tokens to sink, the sink of the crew it is built for.
+        
+        Raises:
+            RuntimeError: If the agent's LLM doesn't use the agency's HTTP client
+        """
+        llm = self._capped_llm(max_tokens, fast)
+        if hasattr(llm, 'model_copy'):
+            # A callback list of its own: crewai's Agent appends to it in place
+            llm = llm.model_copy(update={'callbacks': [*(llm.callbacks or []), sink]})
+        agent = new_agent(name, llm)
+        # Every crew agent, fast_llm's included, must talk through the one HTTP connection
+        # pool behind llm; a copied client would open its own connections per agent
+        if getattr(agent.llm, 'http_client', None) is not getattr(self.llm, 'http_client', None):
+            raise RuntimeError(f"{agent.role} does not share the agency's HTTP client")
+        return agent
+    
+    def _capped_llm(self, max_tokens: int, fast: bool = False) -> Any:
+        """Copy of llm (or fast_llm) with an output limit, shared by all agencies"""
+        return _capped_llm(self.fast_llm if fast else self.llm, max_tokens)
+    
+    @contextmanager
+    def _pooled_crew(self, shape: Tuple[Any, ...], build: Callable[[], _PooledCrew],
+                     prompt_vars: Dict[str, Any],
+                     research_key: Optional[Tuple[str, Optional[str]]] = None
+                     ) -> Iterator["Crew"]:
+        """
+        Check out an idle crew of the given shape, filled with prompt_vars
+        
+        Idle crews are shared by every agency on the same llm and fast_llm.
+        
+        Args:
+            shape: Key of crews with the same tasks, e.g. ('article', True)
+            build: Builds a new crew of this shape when none is idle
+            prompt_vars: Values for the task prompt templates
+            research_key: (topic, audience) the research task's summary is remembered under
+        """
+        key = (id(self.llm), id(self.fast_llm), shape)
+        with _IDLE_CREWS_LOCK:
+            idle = _IDLE_CREWS.setdefault(key, (self.llm, self.fast_llm, []))[2]
+            pooled = idle.pop() if idle else None
+        if pooled is None:
+            pooled = build()
+        pooled.fill(prompt_vars)
+        if pooled.research_task is not None:
+            pooled.research_task.callback = self._remember_research(research_key)
+        # Tokens go to the stream of the workflow call running the crew, if any
+        pooled.sink.stream = current_stream()
+        try:
+            yield pooled.crew
+        finally:
+            pooled.sink.stream = None
+            with _IDLE_CREWS_LOCK:
+                idle.append(pooled)
+    
+    def _remember_research(self, key: Tuple[str, Optional[str]]) -> Callable[[Any], None]:
+        """
+        Task callback that records a research summary under (topic, audience)
+        
+        Article research is also recorded under (topic, None), where campaigns
+        on the topic find it.
+        """
+        topic, audience = key
+        
+        def remember(output: Any) -> None:
+            entry = (time.time(), _task_text(output))
+            self._research_cache[key] = entry
+            if audience is not None:
+                self._research_cache[(topic, None)] = entry
+        return remember
+    
+    def _article_crew(self, topic: str, target_audience: str,
+                      word_count: int) -> ContextManager["Crew"]:
+        """Crew that researches, writes, optimizes and checks one article"""
+        research = self._cached_research(topic, target_audience)
+        prompt_vars = {'topic': topic, 'audience': target_audience, 'word_count': word_count,
+                       'research_notes': _research_notes(research)}
+        with_research = research is None
+        max_tokens = _long_form_tokens(word_count)
+        return self._pooled_crew(('article', with_research, max_tokens),
+                                 lambda: self._build_article_crew(with_research, max_tokens),
+                                 prompt_vars, research_key=(topic, target_audience))
+    
+    def _build_article_crew(self, with_research: bool, max_tokens: int) -> _PooledCrew:
+        """
+        Build an article crew
+        
+        Args:
+            with_research: False leaves out the research task, for cached research
+            max_tokens: Output limit of the tasks that write the article
+        """
+        from crewai import Crew, Task
+        
+        pooled = _PooledCrew(crew=None)
+        researcher = self._capped_agent('research_analyst', RESEARCH_MAX_TOKENS, pooled.sink,
+                                        fast=True)
+        writer = self._capped_agent('content_writer', max_tokens, pooled.sink)
+        seo = self._capped_agent('seo_specialist', max_tokens, pooled.sink, fast=True)
+        qa = self._capped_agent('qa_checker', REVIEW_MAX_TOKENS, pooled.sink, fast=True)
+        # The merge step writes the final article, so it runs on the main model,
+        # with room for its QA report on top of the article
+        editor = self._capped_agent('qa_checker', max_tokens + REPORT_HEADROOM_TOKENS, pooled.sink)
+        
+        # Task 1: Research, skipped when the topic was researched recently
+        research_task = None
+        if with_research:
+            research_task = pooled.research_task = Task(
+                description=_RESEARCH_TMPL,
+                expected_output="A comprehensive research summary with key findings and sources",
+                agent=researcher
+            )
+            pooled.prompts.append((research_task, _RESEARCH_TMPL, research_task.expected_output))
         
         # Task 2: Write article
         writing_task = Task(
-            description=f"""Write a {word_count}-word article about: {topic}
-            
-            Requirements:
-            - Use the research findings
-            - Target audience: {target_audience}
-            - Include: introduction, main points, conclusion
-            - Make it engaging and easy to read
-            - Use active voice and clear language""",
-            expected_output=f"A well-structured {word_count}-word article",
-            agent=self.writer,
-            context=[research_task]
+            description=_WRITING_TMPL,
+            expected_output="A well-structured article",
+            agent=writer,
+            context=[research_task] if research_task else None
         )
+        pooled.prompts.append((writing_task, _WRITING_TMPL + "{research_notes}",
+                               "A well-structured {word_count}-word article"))
         
-        # Task 3: SEO optimization
+        # Task 3: SEO optimization (runs in parallel with the QA review)
         seo_task = Task(
-            description=f"""Optimize the article for SEO
-            
-            Requirements:
-            - Suggest 5-7 relevant keywords
-            - Recommend title variations
-            - Suggest meta description
-            - Identify internal linking opportunities
-            - Ensure content is search-friendly""",
+            description=_SEO_TMPL,
             expected_output="SEO recommendations and optimized version",
-            agent=self.seo,
-            context=[writing_task]
+            agent=seo,
+            context=[writing_task],
+            async_execution=True
         )
         
-        # Task 4: Quality check
+        # Task 4: Quality check (runs in parallel with SEO optimization)
         qa_task = Task(
-            description="""Review the article for quality
-            
-            Check for:
-            - Grammatical errors
-            - Factual accuracy
-            - Logical flow
-            - Readability
-            - Consistency
-            
-            Provide specific feedback if issues are found.""",
-            expected_output="Quality assessment report and final version",
-            agent=self.qa,
-            context=[writing_task, seo_task]
+            description=_QA_TMPL,
+            expected_output="Quality assessment report",
+            agent=qa,
+            context=[writing_task],
+            async_execution=True
         )
         
-        # Create and run the crew
-        crew = Crew(
-            agents=[self.researcher, self.writer, self.seo, self.qa],
-            tasks=[research_task, writing_task, seo_task, qa_task],
-            verbose=2
+        # Task 5: Merge SEO recommendations and QA feedback
+        merge_task = Task(
+            description=_MERGE_TMPL,
+            expected_output="Quality assessment report and final version",
+            agent=editor,
+            context=[writing_task, seo_task, qa_task]
         )
         
-        result = crew.kickoff()
-        
-        return {
-            'article': result,
-            'topic': topic,
-            'audience': target_audience,
-            'word_count': word_count
-        }
+        pooled.crew = Crew(
+            agents=[researcher, writer, seo, qa, editor],
+            tasks=[task for task in (research_task, writing_task, seo_task, qa_task, merge_task) if task],
+            verbose=CREW_VERBOSE
+        )
+        return pooled
     
     def create_social_campaign(self, topic: str, platforms: List[str] = None) -> Dict[str, Any]:
         """
@@ -125,69 +746,231 @@ class ContentAgency:
             platforms: List of platforms (e.g., ['twitter', 'linkedin', 'facebook'])
             
         Returns:
-            Dictionary with posts for each platform
+            Dictionary with posts for each platform. 'posts_by_platform' maps
+            each platform to its post when the posts could be told apart.
+        
+        Drafts that pass _quick_qa are returned as they are; the QA checker
+        only reviews campaigns the automatic checks flag.
+        
+        Raises:
+            ValueError: If the topic is too short or platforms is empty
+        """
+        steps = self._campaign_steps(topic, platforms)
+        try:
+            crew, campaign = _advance(steps)
+            while crew is not None:
+                crew, campaign = _advance(steps, crew.kickoff())
+            return campaign
+        finally:
+            steps.close()
+    
+    async def create_social_campaign_async(self, topic: str,
+                                           platforms: List[str] = None) -> Dict[str, Any]:
+        """
+        Create social media campaign without blocking the event loop
+        
+        Same as create_social_campaign, but awaits the crew with kickoff_async
+        so an async caller (e.g. a Gradio handler) keeps serving other requests.
+        The steps between kickoffs (cache access, crew building, quick QA) block,
+        so they run in a worker thread.
+        """
+        steps = self._campaign_steps(topic, platforms)
+        try:
+            crew, campaign = await asyncio.to_thread(_advance, steps)
+            while crew is not None:
+                crew, campaign = await asyncio.to_thread(_advance, steps,
+                                                         await crew.kickoff_async())
+            return campaign
+        finally:
+            steps.close()
+    
+    def _campaign_steps(self, topic: str, platforms: Optional[List[str]]
+                        ) -> Generator["Crew", Any, Dict[str, Any]]:
+        """
+        Social campaign workflow, shared by the sync and async entry points
+        
+        Yields each crew to run and receives its kickoff result; returns the
+        campaign dictionary. The caller only decides how a crew is kicked off.
         """
         if platforms is None:
             platforms = ['twitter', 'linkedin', 'facebook']
+        topic = _require_topic(topic)
+        if not platforms:
+            raise ValueError("At least one platform is required")
         
-        # Task 1: Research
-        research_task = Task(
-            description=f"""Research the topic: {topic}
-            
-            Focus on:
-            - Current conversations and trends
-            - Engaging angles
-            - Key talking points
-            - Relevant hashtags""",
-            expected_output="Social media research summary",
-            agent=self.researcher
-        )
+        key = self._cache_key('create_social_campaign', topic=topic, platforms=platforms)
+        cached = self._cache_get(key, 'create_social_campaign', topic, platforms=platforms)
+        if cached is not None:
+            return cached
         
-        # Task 2: Create posts
-        social_task = Task(
-            description=f"""Create social media posts about: {topic}
-            
-            Create posts for: {', '.join(platforms)}
-            
-            Requirements:
-            - Platform-specific format and length
-            - Engaging hooks
-            - Clear call-to-action
-            - Relevant hashtags
-            - Emojis where appropriate""",
-            expected_output=f"Social media posts for {len(platforms)} platforms",
-            agent=self.social,
-            context=[research_task]
-        )
-        
-        # Task 3: Quality check
-        qa_task = Task(
-            description="""Review social posts
-            
-            Check for:
-            - Grammar and spelling
-            - Brand voice consistency
-            - Platform appropriateness
-            - Engagement potential""",
-            expected_output="Reviewed and approved social posts",
-            agent=self.qa,
-            context=[social_task]
-        )
+        with self._social_crew(topic, platforms) as crew:
+            yield crew
+            drafts, posts = _drafted_posts(crew, platforms)
         
-        # Create and run the crew
-        crew = Crew(
-            agents=[self.researcher, self.social, self.qa],
-            tasks=[research_task, social_task, qa_task],
-            verbose=2
-        )
+        issues = _quick_qa(posts, platforms)
+        if not issues:
+            return self._store_campaign(key, topic, platforms, _format_posts(posts), posts)
         
-        result = crew.kickoff()
+        with self._social_qa_crew(drafts, issues, platforms) as crew:
+            result = yield crew
+        return self._store_campaign(key, topic, platforms, str(result))
+    
+    def create_social_campaign_stream(self, topic: str, platforms: List[str] = None
+                                      ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Create social media campaign, streaming the team's output as it is generated
         
-        return {
-            'posts': result,
+        Yields:
+            (text_so_far, None) while the crew works, then (text, campaign dictionary)
+        """
+        return astream_call(self.create_social_campaign_async, topic, platforms)
+    
+    def _store_campaign(self, key: str, topic: str, platforms: List[str], text: str,
+                        posts: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Build the campaign dictionary from the final posts and cache it"""
+        campaign = {
+            'posts': text,
             'topic': topic,
             'platforms': platforms
         }
+        if posts is None and len(platforms) > SOCIAL_BATCH_THRESHOLD:
+            posts = _parse_posts(text, platforms)
+        if posts:
+            campaign['posts_by_platform'] = posts
+        self._cache_set(key, campaign, 'create_social_campaign', topic, platforms=platforms)
+        return campaign
+    
+    def _social_crew(self, topic: str, platforms: List[str]) -> ContextManager["Crew"]:
+        """Crew that researches a topic and drafts one post per platform"""
+        # Recent research on the topic, from a campaign or an article for any audience
+        research = self._cached_research(topic)
+        prompt_vars = {'topic': topic, 'platforms': ", ".join(platforms),
+                       'platform_names': platforms, 'research_notes': _research_notes(research)}
+        with_research = research is None
+        return self._pooled_crew(('social', with_research, len(platforms)),
+                                 lambda: self._build_social_crew(with_research, len(platforms)),
+                                 prompt_vars, research_key=(topic, None))
+    
+    def _build_social_crew(self, with_research: bool, platform_count: int) -> _PooledCrew:
+        """
+        Build a social crew for platform_count platforms, with or without research
+        
+        The post tasks come last, one per platform in order followed by a join
+        task (or a single JSON task past SOCIAL_BATCH_THRESHOLD), so
+        _drafted_posts can read them back.
+        """
+        from crewai import Crew, Task
+        
+        pooled = _PooledCrew(crew=None)
+        researcher = self._capped_agent('research_analyst', RESEARCH_MAX_TOKENS, pooled.sink,
+                                        fast=True)
+        social = self._capped_agent('social_media_manager', SOCIAL_MAX_TOKENS, pooled.sink)
+        
+        # Task 1: Research, skipped when the topic was researched recently
+        research_task = None
+        if with_research:
+            research_task = pooled.research_task = Task(
+                description=_SOCIAL_RESEARCH_TMPL,
+                expected_output="Social media research summary",
+                agent=researcher
+            )
+            pooled.prompts.append((research_task, _SOCIAL_RESEARCH_TMPL,
+                                   research_task.expected_output))
+        
+        # Task 2: Create posts. A few platforms get one task each, run in parallel,
+        # with only the research as context; a cheap join task then ends the crew
+        # once every post is written. Past SOCIAL_BATCH_THRESHOLD a single task
+        # writes them all as JSON, paying time-to-first-token once instead of N times.
+        agents = [researcher, social]
+        batched = platform_count > SOCIAL_BATCH_THRESHOLD
+        if batched:
+            batch_task = Task(
+                description=_SOCIAL_BATCH_TMPL,
+                expected_output="A JSON object mapping each platform to a ready-to-publish post",
+                agent=social,
+                context=[research_task] if research_task else None
+            )
+            pooled.prompts.append((batch_task, _SOCIAL_BATCH_TMPL + "{research_notes}",
+                                   batch_task.expected_output))
+            social_tasks = [batch_task]
+        else:
+            social_tasks = []
+            parallel = platform_count > 1
+            for i in range(platform_count):
+                platform = f"{{platform_names[{i}]}}"
+                # Tasks running at the same time need agents of their own
+                if i > 0:
+                    social = self._capped_agent('social_media_manager', SOCIAL_MAX_TOKENS,
+                                                pooled.sink)
+                    agents.append(social)
+                task = Task(
+                    description=_SOCIAL_TMPL,
+                    expected_output="A ready-to-publish post",
+                    agent=social,
+                    context=[research_task] if research_task else None,
+                    async_execution=parallel
+                )
+                pooled.prompts.append((
+                    task,
+                    _SOCIAL_TMPL.replace("{platform}", platform) + "{research_notes}",
+                    f"A ready-to-publish {platform} post"
+                ))
+                social_tasks.append(task)
+            if parallel:
+                # The join's reply isn't part of the campaign: its sink is never attached
+                joiner = self._capped_agent('qa_checker', JOIN_MAX_TOKENS, TokenSink(), fast=True)
+                agents.append(joiner)
+                join_task = Task(
+                    description=_SOCIAL_JOIN_TMPL,
+                    expected_output="DONE",
+                    agent=joiner,
+                    context=list(social_tasks)
+                )
+                pooled.prompts.append((join_task, _SOCIAL_JOIN_TMPL, join_task.expected_output))
+                social_tasks.append(join_task)
+        
+        pooled.crew = Crew(
+            agents=agents,
+            tasks=[task for task in (research_task, *social_tasks) if task],
+            verbose=CREW_VERBOSE
+        )
+        return pooled
+    
+    def _social_qa_crew(self, drafts: str, issues: List[str],
+                        platforms: List[str]) -> ContextManager["Crew"]:
+        """Crew that reviews drafted posts, fixing the issues _quick_qa found"""
+        batched = len(platforms) > SOCIAL_BATCH_THRESHOLD
+        prompt_vars = {'drafts': drafts, 'issues': "\n".join(f"- {issue}" for issue in issues)}
+        return self._pooled_crew(('social_qa', batched),
+                                 lambda: self._build_social_qa_crew(batched), prompt_vars)
+    
+    def _build_social_qa_crew(self, batched: bool) -> _PooledCrew:
+        """Build the social review crew; batched replies keep the JSON format"""
+        from crewai import Crew, Task
+        
+        pooled = _PooledCrew(crew=None)
+        # Its reply is the campaign that is returned, so it runs on the main model
+        qa = self._capped_agent('qa_checker', SOCIAL_MAX_TOKENS, pooled.sink)
+        description = (_SOCIAL_QA_TMPL + (_SOCIAL_QA_JSON_NOTE if batched else "")
+                       + _SOCIAL_ISSUES_TMPL)
+        qa_task = Task(
+            description=description,
+            expected_output="Reviewed and approved social posts",
+            agent=qa
+        )
+        pooled.crew = Crew(agents=[qa], tasks=[qa_task], verbose=CREW_VERBOSE)
+        pooled.prompts.append((qa_task, description, qa_task.expected_output))
+        return pooled
+    
+    def optimize_content_stream(self, existing_content: str
+                                ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Optimize existing content, streaming the team's output as it is generated
+        
+        Yields:
+            (text_so_far, None) while the crew works, then (text, result dictionary)
+        """
+        yield from stream_call(self.optimize_content, existing_content)
     
     def optimize_content(self, existing_content: str) -> Dict[str, Any]:
         """
@@ -198,99 +981,131 @@ class ContentAgency:
             
         Returns:
             Dictionary with optimized content and suggestions
+            
+        Raises:
+            ValueError: If the content is too short to optimize
         """
+        if len((existing_content or "").strip()) < MIN_CONTENT_LENGTH:
+            raise ValueError(f"Content must be at least {MIN_CONTENT_LENGTH} characters")
+        
+        key = self._cache_key('optimize_content', content=existing_content)
+        cached = self._cache_get(key, 'optimize_content', existing_content)
+        if cached is not None:
+            return cached
+        
+        max_tokens = _long_form_tokens(len(existing_content.split()))
+        with self._pooled_crew(('optimize', max_tokens),
+                               lambda: self._build_optimize_crew(max_tokens),
+                               {'content': existing_content}) as crew:
+            result = crew.kickoff()
+        
+        optimized = {
+            'optimized_content': str(result),
+            'original_content': existing_content
+        }
+        self._cache_set(key, optimized, 'optimize_content', existing_content)
+        return optimized
+    
+    def _build_optimize_crew(self, max_tokens: int) -> _PooledCrew:
+        """Build the crew that analyzes, rewrites and checks content, capped at max_tokens"""
+        from crewai import Crew, Task
+        
+        pooled = _PooledCrew(crew=None)
+        seo = self._capped_agent('seo_specialist', max_tokens, pooled.sink, fast=True)
+        writer = self._capped_agent('content_writer', max_tokens, pooled.sink)
+        # The comparison returns the final content, so it runs on the main model,
+        # with room for the comparison on top of the content
+        qa = self._capped_agent('qa_checker', max_tokens + REPORT_HEADROOM_TOKENS, pooled.sink)
         
         # Task 1: SEO analysis
         seo_task = Task(
-            description=f"""Analyze and optimize this content:
-            
-            {existing_content}
-            
-            Provide:
-            - SEO score (1-10)
-            - Keyword suggestions
-            - Content structure improvements
-            - Meta data recommendations""",
+            description=_OPTIMIZE_SEO_TMPL,
             expected_output="SEO analysis and optimization plan",
-            agent=self.seo
+            agent=seo
         )
         
         # Task 2: Rewrite
         writing_task = Task(
-            description="""Rewrite the content based on SEO recommendations
-            
-            Keep:
-            - Core message
-            - Key facts
-            
-            Improve:
-            - Structure
-            - Readability
-            - SEO optimization""",
+            description=_REWRITE_TMPL,
             expected_output="Optimized content version",
-            agent=self.writer,
+            agent=writer,
             context=[seo_task]
         )
         
         # Task 3: Quality check
         qa_task = Task(
-            description="""Compare original and optimized versions
-            
-            Ensure:
-            - Message integrity
-            - Factual accuracy
-            - Quality improvements
-            - No errors introduced""",
+            description=_COMPARE_TMPL,
             expected_output="Final optimized content with comparison",
-            agent=self.qa,
+            agent=qa,
             context=[writing_task]
         )
         
-        # Create and run the crew
-        crew = Crew(
-            agents=[self.seo, self.writer, self.qa],
+        pooled.crew = Crew(
+            agents=[seo, writer, qa],
             tasks=[seo_task, writing_task, qa_task],
-            verbose=2
+            verbose=CREW_VERBOSE
         )
-        
-        result = crew.kickoff()
-        
-        return {
-            'optimized_content': result,
-            'original_content': existing_content
-        }
+        pooled.prompts.append((seo_task, _OPTIMIZE_SEO_TMPL, seo_task.expected_output))
+        return pooled
+
+
+def _role_names(workflow: str) -> Tuple[str, ...]:
+    """Display names of the roles in one of roles.WORKFLOWS"""
+    return tuple(ROLES[name]['role'] for name in WORKFLOWS[workflow])
 
 
-# Workflow metadata for UI
-WORKFLOW_TEMPLATES = {
-    'create_article': {
-        'name': 'Create Article',
-        'description': 'Research, write, optimize, and QA check an article',
-        'agents': ['Research Analyst', 'Content Writer', 'SEO Specialist', 'QA Checker'],
-        'estimated_time': '5-10 minutes',
-        'inputs': {
+@dataclass(frozen=True, slots=True)
+class WorkflowTemplate:
+    """UI metadata for one ContentAgency workflow"""
+    name: str
+    description: str
+    agents: Tuple[str, ...]
+    estimated_time: str
+    # Input name -> widget type, read-only
+    inputs: Mapping[str, str]
+
+
+# Workflow metadata for UI, read-only so callbacks can't mutate the shared copy
+WORKFLOW_TEMPLATES: Mapping[str, WorkflowTemplate] = MappingProxyType({
+    'create_article': WorkflowTemplate(
+        name='Create Article',
+        description='Research, write, optimize, and QA check an article',
+        agents=_role_names('article_creation'),
+        estimated_time='5-10 minutes',
+        inputs=MappingProxyType({
             'topic': 'text',
             'target_audience': 'text',
             'word_count': 'number'
-        }
-    },
-    'create_social_campaign': {
-        'name': 'Social Media Campaign',
-        'description': 'Create posts for multiple social platforms',
-        'agents': ['Research Analyst', 'Social Media Manager', 'QA Checker'],
-        'estimated_time': '3-5 minutes',
-        'inputs': {
+        })
+    ),
+    'create_articles_batch': WorkflowTemplate(
+        name='Batch Articles',
+        description='Create one article per topic, several crews at a time',
+        agents=_role_names('article_creation'),
+        estimated_time='5-10 minutes per group of 8 topics',
+        inputs=MappingProxyType({
+            'topics': 'textarea',
+            'target_audience': 'text',
+            'word_count': 'number'
+        })
+    ),
+    'create_social_campaign': WorkflowTemplate(
+        name='Social Media Campaign',
+        description='Create posts for multiple social platforms',
+        agents=_role_names('social_media_campaign'),
+        estimated_time='3-5 minutes',
+        inputs=MappingProxyType({
             'topic': 'text',
             'platforms': 'multiselect'
-        }
-    },
-    'optimize_content': {
-        'name': 'Optimize Content',
-        'description': 'Improve existing content for better SEO and readability',
-        'agents': ['SEO Specialist', 'Content Writer', 'QA Checker'],
-        'estimated_time': '3-5 minutes',
-        'inputs': {
+        })
+    ),
+    'optimize_content': WorkflowTemplate(
+        name='Optimize Content',
+        description='Improve existing content for better SEO and readability',
+        agents=_role_names('content_optimization'),
+        estimated_time='3-5 minutes',
+        inputs=MappingProxyType({
             'existing_content': 'textarea'
-        }
-    }
-}
\ No newline at end of file
+        })
+    ),
+})